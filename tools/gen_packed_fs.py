@@ -1,25 +1,79 @@
-#!/usr/env python
+#!/usr/bin/env python3
 """
 A tool to generate a .c-file for a built-in "Packed FileSystem".
 Inspired by Mongoose' 'test/pack.c' program.
 """
 
-import os, sys, stat, time, fnmatch, argparse
+import os, sys, io, re, mmap, time, shutil, tempfile, datetime, functools, hashlib, fnmatch, argparse, concurrent.futures
 
 try:
-  import csscompressor, htmlmin, jsmin, io
+  import csscompressor, htmlmin, jsmin
   have_minify = True
 except ImportError:
   have_minify = False
 
+try:
+  import numpy as np
+  have_numpy = True
+except ImportError:
+  have_numpy = False
+
+try:
+  from numba import njit
+  have_numba = have_numpy
+except ImportError:
+  have_numba = False
+
 opt        = None
-files_dict = dict()
+spec_re    = None   # 'opt.spec' compiled to a regexp
 my_name    = os.path.basename (__file__)
-PY2        = (sys.version_info.major == 2)
 
-total_in_bytes  = 0
-total_out_bytes = 0
-num_already_minified = 0
+#
+# The files to pack; one entry per file in each list:
+#   paths:  the name on disk.
+#   mtimes: the modification time.
+#   sizes:  the size on disk. After encoding, the size of the (minified) data.
+#   fnames: the name in 'packed_files[]' (i.e. with '--strip' applied).
+#   arrays: the 'file<N>[]' holding the data; set after encoding.
+#
+paths  = []
+mtimes = []
+sizes  = []
+fnames = []
+arrays = []
+
+#
+# Lookup-tables for the C-array emitters; one entry per byte-value.
+# '_PRINTABLE_MAP' turns CR/LF and other non-printables into spaces for
+# the '// ...' row-comments. A '\' and a '?' are also blanked since a
+# '\' (or the trigraph '??/') at the end of a row would splice the next
+# row into the comment.
+# '_CESC' is the C string-literal form of a byte; printables as-is, the
+# rest as 3-digit octal escapes. Unlike '\xNN', these can not swallow a
+# following digit. A '?' is escaped to avoid trigraphs.
+#
+_HEX           = tuple (" 0x%02X," % i for i in range(256))
+_PRINTABLE_MAP = bytes (c if 32 <= c < 127 and c not in (0x3F, 0x5C) else 32 for c in range(256))
+_CESC          = tuple (chr(c) if 32 <= c < 127 and chr(c) not in '"\\?' else "\\%03o" % c for c in range(256))
+
+#
+# MSVC limits a (concatenated) string-literal to 65535 bytes including the
+# terminating NUL. Bigger files are written as arrays of ' 0xNN,' values.
+#
+MAX_C_STRING = 65535
+
+#
+# Bigger files are hex-encoded this many bytes at a time (a multiple of 16)
+# to keep the 6 times bigger hex-text small.
+#
+HEX_BLOCK = 1 << 16
+
+#
+# Binary files bigger than this are memory-mapped instead of read.
+# Together with the 'HEX_BLOCK'-wise encoding, this keeps such a file in
+# the (reclaimable) page-cache instead of a private 'bytes' copy.
+#
+MMAP_THRESHOLD = 1 << 20
 
 C_TOP = """//
 // Generated at %s by
@@ -28,6 +82,7 @@ C_TOP = """//
 //
 #include <time.h>
 #include <ctype.h>
+#include <stdlib.h>
 #include <string.h>
 
 unsigned    mg_usage_count (size_t i);
@@ -60,24 +115,34 @@ unsigned mg_usage_count (size_t i)
   return (packed_files[i].count);
 }
 
+/*
+ * 'packed_files[]' is sorted on 'name' by the generator; exclude the
+ * terminating NULL-entry from the search.
+ */
+static int packed_file_cmp (const void *key, const void *elem)
+{
+  const struct packed_file *p = (const struct packed_file*) elem;
+
+  return strcmp ((const char*)key, p->name);
+}
+
 const char *mg_unpack (const char *name, size_t *size, time_t *mtime)
 {
   struct packed_file *p;
 
-  for (p = packed_files; p->name; p++)
+  p = bsearch (name, packed_files, sizeof(packed_files) / sizeof(packed_files[0]) - 1,
+               sizeof(packed_files[0]), packed_file_cmp);
+  if (!p)
+     return (NULL);
+
+  if (size)
+     *size = p->size - 1;
+  if (mtime)
   {
-    if (strcmp(p->name, name))
-       continue;
-    if (size)
-       *size = p->size - 1;
-    if (mtime)
-    {
-      *mtime = p->mtime;
-      p->count++;   // count for Mongoose and calls to 'packed_stat()'
-    }
-    return (const char*) p->data;
+    *mtime = p->mtime;
+    p->count++;   // count for Mongoose and calls to 'packed_stat()'
   }
-  return (NULL);
+  return (const char*) p->data;
 }
 """
 
@@ -86,89 +151,169 @@ def trace (level, s):
      print (s)
 
 def fmt_number (num):
-  if num > 1000000:
-     ret = "%d.%03d.%03d" % (num/1000000, (num/1000) % 1000, num % 1000)
-  elif num > 1000:
-     ret = "%d.%03d" % (num/1000, num % 1000)
-  else:
-     ret = "%d" % (num)
-  return ret
+  """ Return 'num' with a '.' as thousands separator. E.g. "1.234.567". """
+  return format (num, ",").replace (",", ".")
+
+@functools.lru_cache (maxsize = None)
+def fmt_time (ftime):
+  """ Return 'ftime' as a local "YYYY-MM-DD HH:MM:SS" string.
+      Cached since many files usually share the same mtime.
+  """
+  return datetime.datetime.fromtimestamp (ftime).isoformat (" ", "seconds")
+
+if have_numpy:
+   _HEX_DIGITS   = np.frombuffer (b"0123456789ABCDEF", dtype = np.uint8)
+   _HEX_TEMPLATE = np.frombuffer (b" 0x00,", dtype = np.uint8)
+
+if have_numba:
+   @njit (cache = True)
+   def _hex_kernel (src, dst):
+     for i in range(src.shape[0]):
+         b = src[i]
+         j = 6 * i
+         dst[j]   = 0x20   # ' '
+         dst[j+1] = 0x30   # '0'
+         dst[j+2] = 0x78   # 'x'
+         dst[j+3] = _HEX_DIGITS [b >> 4]
+         dst[j+4] = _HEX_DIGITS [b & 0xF]
+         dst[j+5] = 0x2C   # ','
+
+def hex_encode (data):
+  """ Return 'data' as a string of ' 0xNN,' values; 6 characters per byte.
+      Uses a Numba kernel or NumPy table-lookups if available.
+  """
+  if have_numba:
+     src = np.frombuffer (data, dtype = np.uint8)
+     dst = np.empty (6 * len(src), dtype = np.uint8)
+     _hex_kernel (src, dst)
+     return str (dst, "ascii")
+  if have_numpy:
+     src = np.frombuffer (data, dtype = np.uint8)
+     dst = np.empty ((len(src), 6), dtype = np.uint8)
+     dst[:]    = _HEX_TEMPLATE
+     dst[:, 3] = _HEX_DIGITS [src >> 4]
+     dst[:, 4] = _HEX_DIGITS [src & 0xF]
+     return str (dst, "ascii")
+  #
+  # A list is faster than a generator here; 'str.join()' would build one
+  # from the generator anyway.
+  #
+  return "".join ([ _HEX[b] for b in data ])
+
+def write_c_string (out_file, data):
+  """ Write 'data' as rows of 16 bytes in adjacent C string-literals.
+      The compiler adds the terminating NUL.
+  """
+  rows = [ '  "%s"' % "".join(_CESC[b] for b in data[n:n+16]) for n in range(0, len(data), 16) ]
+  out_file.write ("\n".join(rows or [ '  ""' ]) + ";\n\n")
+
+def write_c_array (out_file, num, data, comments):
+  """ Write 'data' (a 'bytes' object or memoryview) as 'file<num>[]'.
+      As a C string-literal if small enough for MSVC. Otherwise as rows of
+      16 C hex-values, optionally followed by an ASCII comment for each full row.
+      Returns a hash of 'data' for finding files with identical contents.
+  """
+  data   = memoryview (data)
+  digest = hashlib.blake2b (data, digest_size = 8).digest()
+  if len(data) < MAX_C_STRING:
+     out_file.write ("static const unsigned char file%d[] =\n" % num)
+     write_c_string (out_file, data)
+     return digest
 
-def dump_hex (in_file, out_file, data, data_len, len_in, num):
-  files_dict [in_file]["fsize"] = data_len
-  out_file.write ("//\n// Minified version generated from '%s' (%d%% saving) \n//\n" % (in_file, 100 - 100*data_len/len_in))
   out_file.write ("static const unsigned char file%d[] = {\n" % num)
-  comment = [ " // ", "" ] [opt.nocomments]
-  for n in range(0, data_len):
-      c = data[n]
-      assert ord(c) <= 255
-      out_file.write (" 0x%02X," % ord(c))
-      if not opt.nocomments:
-         if c not in ['\r', '\n']:
-            comment += str(c)
-      if (n + 1) % 16 == 0:
-         out_file.write ("%s\n" % comment)
-         comment = [ " // ", "" ] [opt.nocomments]
+  for start in range(0, len(data), HEX_BLOCK):
+      block = data [start:start+HEX_BLOCK]
+      text  = hex_encode (block)
+      lines = []
+      for n in range(0, len(block), 16):
+          row  = block [n:n+16]
+          line = text [6*n:6*n+96]
+          if len(row) == 16:
+             if comments:
+                line += " // %s\n" % row.tobytes().translate(_PRINTABLE_MAP).decode("ascii")
+             else:
+                line += "\n"
+          lines.append (line)
+      out_file.write ("".join(lines))
   out_file.write (" 0x00\n};\n\n")
+  return digest
+
+def dump_hex (in_file, out_file, data, data_len, len_in, num):
+  out_file.write ("//\n// Minified version generated from '%s' (%d%% saving) \n//\n" % (in_file, 100 - 100*data_len/len_in))
+  return write_c_array (out_file, num, data, not opt.nocomments)
+
+def minify_css (data):
+  return csscompressor.compress (data, preserve_exclamation_comments = False)
+
+def minify_html (data):
+  return htmlmin.minify (data, remove_comments = True, remove_empty_space = False)
+
+def minify_js (data):
+  outs = io.StringIO()
+  jsmin.JavascriptMinify().minify (io.StringIO(data), outs)
+  return outs.getvalue()
+
+def encode_to_hex (minify_fn, in_file, out_file, num):
+  """ Read 'in_file', minify it with 'minify_fn' and hex-encode the UTF-8
+      result straight from a memoryview. The input and minified strings
+      are released before the hex-text is built.
+  """
+  with open (in_file, "r", encoding = "utf-8") as f:
+       data_in = f.read (-1)
+  len_in   = len(data_in.encode("utf-8"))
+  data_out = memoryview (minify_fn(data_in).encode("utf-8"))
+  del data_in
+  len_out  = len(data_out)
+  digest   = dump_hex (in_file, out_file, data_out, len_out, len_in, num)
+  return len_in, len_out, digest
 
 def generate_array_css (in_file, out_file, num):
-  with open (in_file, "r") as f:
-       data_in  = f.read (-1)
-       data_out = csscompressor.compress (data_in, preserve_exclamation_comments = False)
-       len_in   = len(data_in)
-       len_out  = len(data_out)
-       dump_hex (in_file, out_file, data_out, len_out, len_in, num)
-  return len_in, len_out
+  return encode_to_hex (minify_css, in_file, out_file, num)
 
 def generate_array_html (in_file, out_file, num):
-  with open (in_file, "r") as f:
-       data_in  = f.read (-1)
-       data_out = htmlmin.minify (data_in, remove_comments = True, remove_empty_space = False)
-       len_in   = len(data_in)
-       len_out  = len(data_out)
-       dump_hex (in_file, out_file, data_out, len_out, len_in, num)
-  return len_in, len_out
+  return encode_to_hex (minify_html, in_file, out_file, num)
 
 def generate_array_js (in_file, out_file, num):
-  with open (in_file, "r") as f:
-       data_in = f.read (-1)
-       ins  = io.StringIO (data_in)
-       outs = io.StringIO()
-       jsmin.JavascriptMinify().minify (ins, outs)
-       data_out = outs.getvalue()
-       len_in   = len(data_in)
-       len_out  = len(data_out)
-       dump_hex (in_file, out_file, data_out, len_out, len_in, num)
-  return len_in, len_out
+  return encode_to_hex (minify_js, in_file, out_file, num)
 
 def generate_array (in_file, out_file, num):
   with open (in_file, "rb") as f:
        out_file.write ("//\n// Generated from '%s'\n//\n" % in_file)
-       out_file.write ("static const unsigned char file%d[] = {\n" % num)
-       data_in  = f.read (-1)
-       data_out = data_in
-       len_in   = len(data_in)
-       len_out  = len_in
-       for n in range(0, len_in):
-           if PY2:
-              out.write (" 0x%02X," % ord(data_out[n]))
-           else:
-              out_file.write (" 0x%02X," % data_out[n])
-           if (n + 1) % 16 == 0:
-              out_file.write ("\n")
-       out_file.write (" 0x00\n};\n\n")
-  return len_in, len_out
+       if os.fstat(f.fileno()).st_size > MMAP_THRESHOLD:
+          with mmap.mmap (f.fileno(), 0, access = mmap.ACCESS_READ) as data_in:
+               len_in = len(data_in)
+               digest = write_c_array (out_file, num, data_in, False)
+       else:
+          data_in = f.read (-1)
+          len_in  = len(data_in)
+          digest  = write_c_array (out_file, num, data_in, False)
+  return len_in, len_in, digest
+
+def encode_one (job):
+  """ Run the generator of 'job' into a temporary file instead of '--outfile'.
+      Called in a worker-process; returns the name of that file, the in/out
+      lengths and the hash of the data.
+  """
+  generator, in_file, num = job
+  with tempfile.NamedTemporaryFile ("w", buffering = 1 << 20, suffix = ".c", delete = False) as out_file:
+       len_in, len_out, digest = generator (in_file, out_file, num)
+  return out_file.name, len_in, len_out, digest
+
+def init_worker (options):
+  """ Give a worker-process the 'opt' of the main-process.
+  """
+  global opt
+  opt = options
 
 def write_packed_files_array (out):
+  """ Write the 'packed_files[]' entries sorted on 'fname' (in 'strcmp()' order)
+      for the 'bsearch()' in 'mg_unpack()'. Files with identical contents share
+      one 'file<i>[]' array.
+  """
   bytes = 0
-  for i, f in enumerate (files_dict):
-      ftime = files_dict [f]["mtime"]
-      fsize = files_dict [f]["fsize"]
-      fname = files_dict [f]["fname"]
-
-      ftime_str = time.strftime ('%Y-%m-%d %H:%M:%S', time.localtime(ftime))
-      comment   = " // %6d, %s" % (fsize, ftime_str)
-      line      = "  { file%d, sizeof(file%d), 0, %d,  %s\n    \"%s\"\n  },\n" % (i, i, ftime, comment, fname)
+  for ftime, fsize, fname, i in sorted (zip(mtimes, sizes, fnames, arrays), key = lambda e: e[2].encode("utf-8")):
+      comment = " // %6d, %s" % (fsize, fmt_time(int(ftime)))
+      line    = "  { file%d, sizeof(file%d), 0, %d,  %s\n    \"%s\"\n  },\n" % (i, i, ftime, comment, fname)
       out.write (line)
       bytes += fsize
   trace (1, "Total %s bytes data to '%s'" % (fmt_number(bytes), opt.outfile))
@@ -181,24 +326,23 @@ def walktree (top, callback):
   """ Recursively descend the directory tree rooted at top,
       calling the callback function for each regular file
   """
-  for f in sorted (os.listdir (top)):
-      fqfn = os.path.join (top, f)  # Fully Qualified File Name
-      st   = os.stat (fqfn)
-      if opt.recursive and stat.S_ISDIR(st.st_mode):
-         walktree (fqfn, callback)
-      elif stat.S_ISREG(st.st_mode):
-         callback (fqfn, st)
+  with os.scandir (top) as it:
+       entries = sorted (it, key = lambda e: e.name)
+
+  for e in entries:     # 'e.path' is the Fully Qualified File Name
+      if opt.recursive and e.is_dir():
+         walktree (e.path, callback)
+      elif e.is_file():
+         callback (e.path, e.stat())
 
 def add_file (file, st):
   file  = file.replace ("\\", "/")
-  if fnmatch.fnmatch (file, opt.spec):
-     files_dict [file] = { "mtime" : st.st_mtime,
-                           "fsize" : st.st_size,
-                           "fname" : file
-                         }
-     if opt.strip:
-        files_dict [file]["fname"] = file [len(opt.strip):]
-     trace (2, "Adding file '%s'" % files_dict[file]["fname"])
+  if spec_re.match (os.path.normcase(file)):
+     paths.append (file)
+     mtimes.append (st.st_mtime)
+     sizes.append (st.st_size)
+     fnames.append (file [len(opt.strip):] if opt.strip else file)
+     trace (2, "Adding file '%s'" % fnames[-1])
 
   else:
      trace (1, "File '%s' does not match 'opt.spec'" % file)
@@ -212,7 +356,8 @@ def show_help (error=None):
   print ("""Usage: %s [options] <file-spec>
   -h, --help:         Show this help.
   -c, --case:         Be case-sensitive.
-  -m, --minify:       Compress the .js/.css/.html files first (not for Python2).
+  -j, --jobs N:       Number of worker-processes (default: number of CPUs).
+  -m, --minify:       Compress the .js/.css/.html files first.
   -o, --outfile:      File to generate.
   -r, --recursive:    Walk the sub-directies recursively.
   -s, --strip X:      Strip 'X' from paths.
@@ -223,6 +368,7 @@ def show_help (error=None):
 def parse_cmdline():
   parser = argparse.ArgumentParser (add_help = False)
   parser.add_argument ("-h", "--help",        dest = "help", action = "store_true")
+  parser.add_argument ("-j", "--jobs",        dest = "jobs", type = int, default = os.cpu_count() or 1)
   parser.add_argument ("-m", "--minify",      dest = "minify", action = "store_true")
   parser.add_argument (      "--no-comments", dest = "nocomments", action = "store_true", default = False)
   parser.add_argument ("-o", "--outfile",     dest = "outfile", type = str)
@@ -233,79 +379,129 @@ def parse_cmdline():
 
   return parser.parse_args()
 
-opt = parse_cmdline()
-if opt.help:
-   show_help()
-
-if not opt.outfile:
-   show_help ("Missing '--outfile'")
-
-if not opt.spec:
-   show_help ("Missing 'spec'")
-
-if PY2:
-   have_minify = False
+def main():
+  global opt, spec_re
+  opt = parse_cmdline()
+  if opt.help:
+     show_help()
 
-if opt.minify and not have_minify:
-   show_help ("Option '--minify' not available")
+  if not opt.outfile:
+     show_help ("Missing '--outfile'")
 
-opt.spec = opt.spec[0].replace ("\\", "/")
-if opt.spec[-1] in [ "\\", "/" ]:
-   opt.spec += "*"
+  if not opt.spec:
+     show_help ("Missing 'spec'")
 
-if not os.path.dirname(opt.spec):  # A '*.xx' -> './*.xx'
-   opt.spec = "./" + opt.spec
+  if opt.minify and not have_minify:
+     show_help ("Option '--minify' not available")
 
-dirname = os.path.dirname(opt.spec)
-if not os.path.exists(dirname):
-   show_help ("Directory '%s' not found" % dirname)
+  opt.spec = opt.spec[0].replace ("\\", "/")
+  if opt.spec[-1] in [ "\\", "/" ]:
+     opt.spec += "*"
 
-trace (1, "spec: '%s'" % opt.spec)
+  if not os.path.dirname(opt.spec):  # A '*.xx' -> './*.xx'
+     opt.spec = "./" + opt.spec
 
-walktree (os.path.dirname(opt.spec), add_file)
-if len(files_dict) == 0:
-   print ("No files matching '%s'" % opt.spec)
-   sys.exit (1)
+  dirname = os.path.dirname(opt.spec)
+  if not os.path.exists(dirname):
+     show_help ("Directory '%s' not found" % dirname)
 
-out = open (opt.outfile, "w+")
+  trace (1, "spec: '%s'" % opt.spec)
 
-out.write (C_TOP % (time.ctime(), sys.executable, __file__))
+  #
+  # Same as 'fnmatch.fnmatch()', but compiled once. That saves the
+  # per-call cache-lookup and 'normcase()' of the pattern.
+  #
+  spec_re = re.compile (fnmatch.translate(os.path.normcase(opt.spec)))
 
-minifiers = { }
-minifiers [".css"]  = generate_array_css
-minifiers [".js"]   = generate_array_js
-minifiers [".html"] = generate_array_html
-minifiers [".*"]    = generate_array
-
-for n, f in enumerate (files_dict):
-    size = fmt_number (files_dict[f]["fsize"])
-    already_minified = f.endswith (".min.css") or f.endswith (".min.js")
-    num_already_minified += already_minified
-    comment = ["", "(already_minified)" ]
-
-    if not opt.minify or already_minified:
-       trace (1, "%10s: Generating C-array for '%s' %s" % (size, f, comment [already_minified]))
-       len_in, len_out = minifiers [".*"] (f, out, n)
-    else:
-       ext = f [f.rfind("."):]
-       if ext in minifiers:
-          trace (1, "%10s: Generating minified C-array for '%s'" % (size, f))
-          len_in, len_out = minifiers [ext] (f, out, n)
-       else:
-          trace (1, "%10s: Generating C-array for '%s'" % (size, f))
-          len_in, len_out = minifiers [".*"] (f, out, n)
-
-    total_in_bytes  += len_in
-    total_out_bytes += len_out
-
-out.write (C_ARRAY)
-write_packed_files_array (out)
+  walktree (os.path.dirname(opt.spec), add_file)
+  if len(paths) == 0:
+     print ("No files matching '%s'" % opt.spec)
+     sys.exit (1)
 
-out.write (C_BOTTOM)
-out.close()
+  num_already_minified = 0
+  out = open (opt.outfile, "w", buffering = 1 << 20)  # 1 MByte buffer; the writes are many and small
+
+  out.write (C_TOP % (time.ctime(), sys.executable, __file__))
+
+  minifiers = { }
+  minifiers [".css"]  = generate_array_css
+  minifiers [".js"]   = generate_array_js
+  minifiers [".html"] = generate_array_html
+
+  jobs = []
+  for n, f in enumerate (paths):
+      size = fmt_number (sizes[n])
+      already_minified = f.endswith (".min.css") or f.endswith (".min.js")
+      num_already_minified += already_minified
+      comment = ["", "(already_minified)" ]
+
+      generator = generate_array
+      if opt.minify and not already_minified:
+         generator = minifiers.get (os.path.splitext(f)[1].lower(), generate_array)
+
+      if generator is generate_array:
+         trace (1, "%10s: Generating C-array for '%s' %s" % (size, f, comment [already_minified]))
+      else:
+         trace (1, "%10s: Generating minified C-array for '%s'" % (size, f))
+      jobs.append ((generator, f, n))
+
+  #
+  # The files are independent of each other; encode them in parallel
+  # into temporary files and copy these to 'out' in the original order.
+  # With '-j1' (or a single file), the generators write to 'out' directly.
+  #
+  pool = None
+  if opt.jobs > 1 and len(jobs) > 1:
+     pool = concurrent.futures.ProcessPoolExecutor (max_workers = min(opt.jobs, len(jobs)),
+                                                    initializer = init_worker, initargs = (opt,))
+     results = pool.map (encode_one, jobs)
+
+  #
+  # A file with the same contents as an earlier one reuses that 'file<N>[]'.
+  #
+  seen = dict()    # hash -> 'file<N>[]'
+  total_in_bytes  = 0
+  total_out_bytes = 0
+  for generator, f, n in jobs:
+      if pool:
+         tmp_name, len_in, len_out, digest = next (results)
+      else:
+         start = out.tell()
+         len_in, len_out, digest = generator (f, out, n)
+
+      array = seen.setdefault (digest, n)
+      if array == n:
+         if pool:
+            with open (tmp_name, "r") as tmp:
+                 shutil.copyfileobj (tmp, out, 1 << 20)
+      else:
+         if not pool:   # drop what 'generator' just wrote
+            out.seek (start)
+            out.truncate()
+         trace (1, "'%s' is identical to 'file%d[]'" % (f, array))
+         out.write ("//\n// '%s' is identical to 'file%d[]'\n//\n\n" % (f, array))
+
+      if pool:
+         os.remove (tmp_name)
+      sizes [n] = len_out
+      arrays.append (array)
+      total_in_bytes  += len_in
+      total_out_bytes += len_out
+
+  if pool:
+     pool.shutdown()
+
+  out.write (C_ARRAY)
+  write_packed_files_array (out)
+
+  out.write (C_BOTTOM)
+  out.close()
+
+  if opt.minify:
+     savings = 100 - 100 * total_out_bytes / total_in_bytes
+     trace (1, "The '--minify' option gave %d%% total savings." % savings)
+  else:
+     trace (1, "Found %d files already minified." % num_already_minified)
 
-if opt.minify:
-   savings = 100 - 100 * total_out_bytes / total_in_bytes
-   trace (1, "The '--minify' option gave %d%% total savings." % savings)
-else:
-   trace (1, "Found %d files already minified." % num_already_minified)
+if __name__ == "__main__":
+   main()